@@ -18,7 +18,7 @@ Usage:
 
 Dependencies:
 
-    pip install openpyxl usfm-tools
+    pip install openpyxl usfm-tools regex orjson ijson
 
 Notes:
 
@@ -33,95 +33,218 @@ Notes:
 """
 
 import argparse
-import json
+import mmap
+import os
 import re
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
+import ijson  # type: ignore
+import orjson
+import regex as _regex  # type: ignore
 
-def normalize(word: str) -> str:
-    return unicodedata.normalize("NFC", word).strip()
+from utils import normalize
 
+# A token is a run of letters together with their combining marks (vowel
+# points, cantillation).  The stdlib `re` module does not understand Unicode
+# property classes, hence the `regex` module.
+_TOKEN_RE = _regex.compile(r"[\p{L}\p{M}]+")
 
-def load_lexicon(path: Path) -> Dict[str, Dict]:
-    """Load the lexicon file and build a mapping from lemma to id."""
-    with path.open("r", encoding="utf-8") as f:
-        entries = json.load(f)
-    lemma_to_id: Dict[str, str] = {}
-    for entry in entries:
-        lemma = normalize(entry["lemma"])
-        lemma_to_id[lemma] = entry["id"]
-    return lemma_to_id
+# One match per non-blank USFM line: either a `\marker content` line or a run
+# of verse text.  Leading indentation is skipped.  Lines may end in LF, CRLF or
+# a bare CR, matching what universal-newline text mode accepted.
+_USFM_LINE_RE = re.compile(rb"(?:^|(?<=\r))[ \t]*(?:\\(\w+)[ \t]*([^\r\n]*)|(\S[^\r\n]*))", re.MULTILINE)
+
+
+def load_lexicon(path: Path) -> Dict[str, str]:
+    """Load the lexicon file and build a mapping from lemma to id.
+
+    Entries are streamed with ijson so the full lexicon list is never held in
+    memory alongside the map.  Keys are deliberately not interned: a token
+    looked up against them would first need its own `sys.intern` probe, which
+    costs as much as the `dict.get` it would speed up.
+    """
+    with path.open("rb") as f:
+        return {normalize(entry["lemma"]): entry["id"] for entry in ijson.items(f, "item")}
 
 
 def parse_usfm(usfm_path: Path) -> List[Tuple[str, int, int, str]]:
-    """Parse a USFM file and yield tuples of (book, chapter, verse, verse_text)."""
-    verses = []
-    current_book = None
-    current_chapter = None
-    current_verse = None
-    verse_text_parts: List[str] = []
-    usfm_re = re.compile(r"\\(\w+)\s*(.*)")
-    with usfm_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            match = usfm_re.match(line)
-            if match:
-                marker, content = match.groups()
-                if marker == "id":
-                    current_book = content.split()[0]
-                elif marker == "c":
-                    if current_book is None:
-                        continue
-                    current_chapter = int(content)
-                elif marker == "v":
-                    # flush previous verse
-                    if current_book and current_chapter and current_verse is not None:
-                        verses.append((current_book, current_chapter, current_verse, " ".join(verse_text_parts)))
-                        verse_text_parts = []
-                    current_verse = int(content)
-                else:
-                    # other marker: ignore
-                    pass
-            else:
+    """Parse a USFM file and yield tuples of (book, chapter, verse, verse_text).
+
+    Verse text is returned in Unicode NFC.
+
+    The file is memory-mapped and scanned with a single regex pass rather than
+    decoded and matched line by line; verse text is gathered as raw bytes and
+    decoded once per verse.
+    """
+    verses: List[Tuple[str, int, int, str]] = []
+    current_book: Optional[str] = None
+    current_chapter: Optional[int] = None
+    current_verse: Optional[int] = None
+    # Raw UTF-8 text of the current verse, space-separated; decoded once on flush
+    buf = bytearray()
+
+    def flush() -> None:
+        if current_book and current_chapter and current_verse is not None:
+            # Normalize the whole verse once so tokens need no per-token NFC pass
+            verse_text = unicodedata.normalize("NFC", buf.decode("utf-8").rstrip())
+            verses.append((current_book, current_chapter, current_verse, verse_text))
+        buf.clear()
+
+    if usfm_path.stat().st_size == 0:
+        # mmap refuses empty files
+        return verses
+    with usfm_path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for match in _USFM_LINE_RE.finditer(mm):
+            marker, content, text_run = match.groups()
+            if text_run is not None:
                 # append to verse text
                 if current_book and current_chapter and current_verse is not None:
-                    verse_text_parts.append(line)
-        # flush last verse
-        if current_book and current_chapter and current_verse is not None:
-            verses.append((current_book, current_chapter, current_verse, " ".join(verse_text_parts)))
+                    buf.extend(text_run.rstrip())
+                    buf.append(0x20)
+            elif marker == b"id":
+                flush()
+                current_book = content.decode("utf-8").split()[0]
+                current_chapter = current_verse = None
+            elif marker == b"c":
+                if current_book is None:
+                    continue
+                flush()
+                current_chapter = int(content)
+                current_verse = None
+            elif marker == b"v":
+                flush()
+                # Verse text may follow the number on the same line
+                number, *rest = content.split(None, 1)
+                current_verse = int(number)
+                if rest and rest[0].strip():
+                    buf.extend(rest[0].rstrip())
+                    buf.append(0x20)
+            # other markers: ignore
+    # flush last verse
+    flush()
     return verses
 
 
-def tokenize(text: str) -> List[str]:
-    """Tokenize a verse by splitting on whitespace and punctuation."""
-    # Remove punctuation (except Hebrew cantillation marks which should be removed anyway)
-    tokens = re.split(r"[\s\d\p{P}]+", text)
-    return [normalize(token) for token in tokens if token]
-
-
-def build_concordance(verses: List[Tuple[str, int, int, str]], lemma_to_id: Dict[str, str], source_name: str) -> List[Dict]:
-    """Generate concordance entries for a list of verses."""
-    concordance: List[Dict] = []
-    for book, chapter, verse_num, verse_text in verses:
-        tokens = tokenize(verse_text)
-        for idx, token in enumerate(tokens):
-            lemma_id = lemma_to_id.get(token)
-            if lemma_id:
-                concordance.append({
-                    "lemma_id": lemma_id,
-                    "source": source_name,
-                    "reference": {
-                        "book": book,
-                        "chapter": chapter,
-                        "verse": verse_num
-                    },
-                    "occurrence_indices": [idx]
-                })
-    return concordance
+def tokenize(text: str) -> Iterator[str]:
+    """Tokenize a verse into runs of letters, dropping whitespace, digits and punctuation.
+
+    Tokens are yielded as-is, so `text` should already be NFC (as produced by
+    `parse_usfm`).
+    """
+    for match in _TOKEN_RE.finditer(text):
+        yield match.group(0)
+
+
+# Below this many verses the cost of starting worker processes outweighs the gain
+_PARALLEL_MIN_VERSES = 2000
+
+# Verses per serialized chunk, and per task sent to a worker
+_CHUNK_VERSES = 256
+
+# Per-worker state installed by `_init_worker`
+_LEMMA_TO_ID: Dict[str, str] = {}
+_SOURCE_NAME = ""
+
+
+def _verse_entries(verse: Tuple[str, int, int, str], lemma_to_id: Dict[str, str], source_name: str) -> List[Dict]:
+    """Return the concordance entries for a single verse.
+
+    Lemmas must match whole tokens and occurrences are recorded as token
+    positions, so the verse is scanned once by `tokenize` and each token costs
+    a single dict probe.  A multi-pattern automaton (e.g. Aho-Corasick) would
+    report every substring hit and still need the token boundaries to filter
+    them and to number them.
+
+    `verse_text` must already be NFC (as produced by `parse_usfm`); tokens are
+    looked up as-is.
+    """
+    book, chapter, verse_num, verse_text = verse
+    # Group token positions per lemma so each lemma yields one entry per verse
+    by_lemma: Dict[str, List[int]] = {}
+    for idx, token in enumerate(tokenize(verse_text)):
+        lemma_id = lemma_to_id.get(token)
+        if lemma_id is not None:
+            by_lemma.setdefault(lemma_id, []).append(idx)
+    return [
+        {
+            "lemma_id": lemma_id,
+            "source": source_name,
+            "reference": {
+                "book": book,
+                "chapter": chapter,
+                "verse": verse_num
+            },
+            "occurrence_indices": indices
+        }
+        for lemma_id, indices in by_lemma.items()
+    ]
+
+
+def _init_worker(lemma_to_id: Dict[str, str], source_name: str) -> None:
+    global _LEMMA_TO_ID, _SOURCE_NAME
+    _LEMMA_TO_ID = lemma_to_id
+    _SOURCE_NAME = source_name
+
+
+def _serialize_verses(verses: List[Tuple[str, int, int, str]], lemma_to_id: Dict[str, str], source_name: str) -> Tuple[bytes, int]:
+    """Serialize the concordance entries for a run of verses.
+
+    Returns the entries as JSON objects separated by `,\\n` (no enclosing
+    brackets) together with the number of entries.
+    """
+    entries = [
+        orjson.dumps(entry)
+        for verse in verses
+        for entry in _verse_entries(verse, lemma_to_id, source_name)
+    ]
+    return b",\n".join(entries), len(entries)
+
+
+def _process_verses(verses: List[Tuple[str, int, int, str]]) -> Tuple[bytes, int]:
+    return _serialize_verses(verses, _LEMMA_TO_ID, _SOURCE_NAME)
+
+
+def build_concordance(verses: List[Tuple[str, int, int, str]], lemma_to_id: Dict[str, str], source_name: str) -> Iterator[Tuple[bytes, int]]:
+    """Generate serialized concordance entries for a list of verses, in verse order.
+
+    Verses are processed in runs of `_CHUNK_VERSES`; each run yields a chunk
+    of already-encoded JSON and its entry count (see `_serialize_verses`).
+    Large corpora are sharded across one worker process per CPU.  The lexicon
+    map is handed to each worker once at start-up, and workers send back
+    bytes rather than entry dicts so the parent never has to unpickle and
+    re-encode them.
+    """
+    chunks = (verses[start:start + _CHUNK_VERSES] for start in range(0, len(verses), _CHUNK_VERSES))
+    if len(verses) < _PARALLEL_MIN_VERSES:
+        for chunk in chunks:
+            yield _serialize_verses(chunk, lemma_to_id, source_name)
+        return
+    with ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=_init_worker,
+                             initargs=(lemma_to_id, source_name)) as executor:
+        yield from executor.map(_process_verses, chunks)
+
+
+def write_json_array(path: Path, chunks: Iterable[Tuple[bytes, int]]) -> int:
+    """Stream serialized chunks to `path` as a JSON array, one entry per line.
+
+    `chunks` are `(data, count)` pairs as produced by `build_concordance`.
+    They are written as-is, so memory use does not grow with the size of the
+    output.  Returns the number of entries written.
+    """
+    count = 0
+    with path.open("wb") as f:
+        f.write(b"[")
+        for data, chunk_count in chunks:
+            if not chunk_count:
+                continue
+            f.write(b",\n" if count else b"\n")
+            f.write(data)
+            count += chunk_count
+        f.write(b"\n]\n" if count else b"]\n")
+    return count
 
 
 def main() -> None:
@@ -140,28 +263,22 @@ def main() -> None:
     if args.tanakh:
         print("Processing Tanakh...")
         tanakh_verses = parse_usfm(Path(args.tanakh))
-        tanakh_concordance = build_concordance(tanakh_verses, lemma_to_id, "Tanakh")
-        with (output_dir / "tanakh_concordance.json").open("w", encoding="utf-8") as f:
-            json.dump(tanakh_concordance, f, ensure_ascii=False, indent=2)
-        print(f"Wrote {len(tanakh_concordance)} concordance entries for Tanakh.")
+        count = write_json_array(output_dir / "tanakh_concordance.json", build_concordance(tanakh_verses, lemma_to_id, "Tanakh"))
+        print(f"Wrote {count} concordance entries for Tanakh.")
 
     # Targums and Peshitta can be implemented similarly using parse_usfm or another parser
     # For demonstration, we simply skip them if not provided
     if args.targums:
         print("Processing Targums (experimental)...")
         targum_verses = parse_usfm(Path(args.targums))
-        targum_concordance = build_concordance(targum_verses, lemma_to_id, "Targums")
-        with (output_dir / "targums_concordance.json").open("w", encoding="utf-8") as f:
-            json.dump(targum_concordance, f, ensure_ascii=False, indent=2)
-        print(f"Wrote {len(targum_concordance)} concordance entries for Targums.")
+        count = write_json_array(output_dir / "targums_concordance.json", build_concordance(targum_verses, lemma_to_id, "Targums"))
+        print(f"Wrote {count} concordance entries for Targums.")
 
     if args.peshitta:
         print("Processing Peshitta...")
         peshitta_verses = parse_usfm(Path(args.peshitta))
-        peshitta_concordance = build_concordance(peshitta_verses, lemma_to_id, "Peshitta")
-        with (output_dir / "peshitta_concordance.json").open("w", encoding="utf-8") as f:
-            json.dump(peshitta_concordance, f, ensure_ascii=False, indent=2)
-        print(f"Wrote {len(peshitta_concordance)} concordance entries for Peshitta.")
+        count = write_json_array(output_dir / "peshitta_concordance.json", build_concordance(peshitta_verses, lemma_to_id, "Peshitta"))
+        print(f"Wrote {count} concordance entries for Peshitta.")
 
 
 if __name__ == "__main__":
@@ -19,87 +19,137 @@ Usage:
 
 Dependencies:
 
-    pip install html2text striprtf
+    pip install apsw selectolax striprtf orjson
 
 """
 
 import argparse
-import json
-import sqlite3
-import unicodedata
+import functools
 from pathlib import Path
 from typing import Dict, List
 
-import html2text  # type: ignore
+import apsw  # type: ignore
+import orjson
+from selectolax.lexbor import LexborHTMLParser  # type: ignore
 from striprtf.striprtf import rtf_to_text  # type: ignore
 
+from utils import normalize
 
-def normalize(text: str) -> str:
-    return unicodedata.normalize("NFC", text).strip()
 
+# Fields every dictionary entry starts with; the mutable ones are replaced per entry
+_ENTRY_TEMPLATE: Dict = {
+    "id": "",
+    "word": "",
+    "definitions": [],
+    "biblical_lemma_ids": [],
+    "pos": "",
+    "notes": ""
+}
 
-def extract_dctx(db_path: Path) -> List[Dict]:
-    """Extract dictionary entries from a .dctx (RTF) module."""
-    conn = sqlite3.connect(str(db_path))
-    cursor = conn.cursor()
+
+def _connect_readonly(db_path: Path) -> apsw.Connection:
+    """Open a module database read-only with memory-mapped I/O.
+
+    `immutable=1` tells SQLite the file cannot change underneath it, so it
+    skips locking, and mmap lets reads come straight from the page cache.
+    apsw is used instead of sqlite3 because its cursor iterates rows in C
+    without sqlite3's adapter/converter layer.
+    """
+    conn = apsw.Connection(
+        f"{db_path.resolve().as_uri()}?mode=ro&immutable=1",
+        flags=apsw.SQLITE_OPEN_READONLY | apsw.SQLITE_OPEN_URI,
+    )
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+def _select_entries(conn: apsw.Connection) -> apsw.Cursor:
+    """Return a cursor over the (word, definition) rows of a dictionary module."""
     # According to community knowledge, the table storing dictionary entries is named 'Entries'
     try:
-        cursor.execute("SELECT word, definition FROM entries")
-    except sqlite3.OperationalError:
+        return conn.execute("SELECT word, definition FROM entries")
+    except apsw.SQLError:
         # Fallback: some modules use different casing
-        cursor.execute("SELECT Word, Definition FROM Entries")
+        return conn.execute("SELECT Word, Definition FROM Entries")
+
+
+# Definitions at least this long are converted directly rather than cached
+_RTF_CACHE_MAX_LEN = 64_000
+
+
+@functools.lru_cache(maxsize=50_000)
+def _rtf_to_text_cached(rtf: str) -> str:
+    return rtf_to_text(rtf)
+
+
+def rtf_to_plain(rtf: str) -> str:
+    """Convert an RTF definition to plain text.
+
+    Modules repeat a lot of boilerplate (cross-reference stubs, "see ..."
+    entries), so conversions are memoized; the rare huge entries skip the
+    cache so they are not pinned in memory.
+    """
+    if len(rtf) < _RTF_CACHE_MAX_LEN:
+        return _rtf_to_text_cached(rtf)
+    return rtf_to_text(rtf)
+
+
+# Elements whose content must not run into neighbouring text
+_BLOCK_SELECTOR = ", ".join([
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt",
+    "figcaption", "figure", "footer", "h1", "h2", "h3", "h4", "h5", "h6",
+    "header", "hr", "li", "ol", "p", "pre", "section", "table", "td", "th",
+    "tr", "ul",
+])
+
+
+def html_to_text(html: str) -> str:
+    """Strip markup from an HTML fragment and return its plain text.
+
+    Inline markup is removed without adding spaces, so `wo<b>rd</b>s` stays
+    one word; block-level elements are separated by a space, and runs of
+    whitespace are collapsed.
+    """
+    if not html:
+        return ""
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(["script", "style"])
+    if tree.body is None:
+        return ""
+    for node in tree.body.css(_BLOCK_SELECTOR):
+        node.insert_before(" ")
+        node.insert_after(" ")
+    return " ".join(tree.body.text(separator="").split())
+
+
+def extract_dctx(db_path: Path) -> List[Dict]:
+    """Extract dictionary entries from a .dctx (RTF) module."""
+    conn = _connect_readonly(db_path)
     entries: List[Dict] = []
-    entry_id_counter = 1
-    for word, definition_rtf in cursor.fetchall():
-        word_norm = normalize(word)
-        definition_plain = normalize(rtf_to_text(definition_rtf))
-        entries.append({
-            "id": f"MH{entry_id_counter:05d}",
-            "word": word_norm,
-            "definitions": [
-                {
-                    "gloss": definition_plain,
-                    "example": ""
-                }
-            ],
-            "biblical_lemma_ids": [],
-            "pos": "",
-            "notes": ""
-        })
-        entry_id_counter += 1
+    for entry_id, (word, definition_rtf) in enumerate(_select_entries(conn), 1):
+        entry = _ENTRY_TEMPLATE.copy()
+        entry["id"] = f"MH{entry_id:05d}"
+        entry["word"] = normalize(word)
+        entry["definitions"] = [{"gloss": normalize(rtf_to_plain(definition_rtf)), "example": ""}]
+        entry["biblical_lemma_ids"] = []
+        entries.append(entry)
     conn.close()
     return entries
 
 
 def extract_dcti(db_path: Path) -> List[Dict]:
     """Extract dictionary entries from a .dcti (HTML) module."""
-    conn = sqlite3.connect(str(db_path))
-    cursor = conn.cursor()
-    try:
-        cursor.execute("SELECT word, definition FROM entries")
-    except sqlite3.OperationalError:
-        cursor.execute("SELECT Word, Definition FROM Entries")
+    conn = _connect_readonly(db_path)
     entries: List[Dict] = []
-    entry_id_counter = 1
-    h = html2text.HTML2Text()
-    h.ignore_links = True
-    for word, definition_html in cursor.fetchall():
-        word_norm = normalize(word)
-        definition_plain = normalize(h.handle(definition_html))
-        entries.append({
-            "id": f"MH{entry_id_counter:05d}",
-            "word": word_norm,
-            "definitions": [
-                {
-                    "gloss": definition_plain,
-                    "example": ""
-                }
-            ],
-            "biblical_lemma_ids": [],
-            "pos": "",
-            "notes": ""
-        })
-        entry_id_counter += 1
+    for entry_id, (word, definition_html) in enumerate(_select_entries(conn), 1):
+        entry = _ENTRY_TEMPLATE.copy()
+        entry["id"] = f"MH{entry_id:05d}"
+        entry["word"] = normalize(word)
+        entry["definitions"] = [{"gloss": normalize(html_to_text(definition_html)), "example": ""}]
+        entry["biblical_lemma_ids"] = []
+        entries.append(entry)
     conn.close()
     return entries
 
@@ -125,8 +175,8 @@ def main() -> None:
         raise FileNotFoundError(f"Input file {input_path} not found")
     entries = parse_esword_module(input_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", encoding="utf-8") as f:
-        json.dump(entries, f, ensure_ascii=False, indent=2)
+    with output_path.open("wb") as f:
+        f.write(orjson.dumps(entries, option=orjson.OPT_INDENT_2))
     print(f"Extracted {len(entries)} entries from {input_path} into {output_path}")
 
 
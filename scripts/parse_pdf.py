@@ -16,7 +16,7 @@ Usage:
 
 Dependencies:
 
-    pip install pdfminer.six
+    pip install pypdfium2 pdfminer.six regex orjson
 
 Notes:
 
@@ -29,18 +29,24 @@ Notes:
 """
 
 import argparse
-import json
-import re
-import unicodedata
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Iterator
+from typing import List, Dict, Iterable, Iterator
 
-from pdfminer.high_level import extract_text
+import orjson
+import pypdfium2 as pdfium  # type: ignore
+import regex as _regex  # type: ignore
+from pdfminer.high_level import extract_text as pdfminer_extract_text
 
+from utils import normalize
 
-def normalize(text: str) -> str:
-    """Normalize Hebrew/Aramaic text to NFC and strip extraneous whitespace."""
-    return unicodedata.normalize("NFC", text).strip()
+# Example pattern: lines that start with a Hebrew or Aramaic word (letters and
+# points of the Hebrew script) followed by a space and then a definition.
+# This is just a placeholder; adapt as needed.
+ENTRY_PATTERN = _regex.compile(r"^(\p{Hebrew}+)\s+(.+)$", _regex.MULTILINE)
 
 
 def iter_entries(text: str) -> Iterator[Dict]:
@@ -51,12 +57,8 @@ def iter_entries(text: str) -> Iterator[Dict]:
     structure of your lexicon.  Each entry should produce a dictionary
     following the `lexicon_entries.json` schema.
     """
-    # Example pattern: lines that start with a Hebrew or Aramaic word (letters
-    # from Unicode ranges U+0590–U+05FF) followed by a space and then a
-    # definition.  This is just a placeholder; adapt as needed.
-    entry_pattern = re.compile(r"^([\u0590-\u05FF]+)\s+(.+)$", re.MULTILINE)
     entry_id_counter = 1
-    for match in entry_pattern.finditer(text):
+    for match in ENTRY_PATTERN.finditer(text):
         lemma = normalize(match.group(1))
         definition = match.group(2).strip()
         # Build an entry.  At minimum we need id, lemma, language and definitions.
@@ -80,10 +82,93 @@ def iter_entries(text: str) -> Iterator[Dict]:
         yield entry
 
 
+# Measured wall time to spawn a worker and import this module into it
+_WORKER_STARTUP_SECONDS = 0.25
+
+# Per-worker state installed by `_init_worker`
+_WORKER_PDF_PATH = ""
+
+
+def _page_texts(doc, page_indices: Iterable[int]) -> List[str]:
+    """Return the PDFium text of the given pages of an open document."""
+    texts: List[str] = []
+    for index in page_indices:
+        page = doc[index]
+        textpage = page.get_textpage()
+        try:
+            # PDFium separates lines with CRLF
+            texts.append(textpage.get_text_range().replace("\r\n", "\n"))
+        finally:
+            textpage.close()
+            page.close()
+    return texts
+
+
+def _init_worker(pdf_path: str) -> None:
+    global _WORKER_PDF_PATH
+    _WORKER_PDF_PATH = pdf_path
+
+
+def _extract_chunk_pdfminer(page_indices: List[int]) -> str:
+    return pdfminer_extract_text(_WORKER_PDF_PATH, page_numbers=page_indices)
+
+
+def _chunk_pages(page_indices: List[int], chunk_count: int) -> List[List[int]]:
+    """Split page indices into at most `chunk_count` contiguous runs."""
+    size = -(-len(page_indices) // chunk_count)
+    return [page_indices[start:start + size] for start in range(0, len(page_indices), size)]
+
+
+def _pdfminer_text(pdf_path: Path, page_count: int) -> str:
+    """Extract text with pdfminer, using worker processes when it pays off.
+
+    pdfminer can spend tens of milliseconds on a dense page, but each spawned
+    worker costs about `_WORKER_STARTUP_SECONDS` before it does any work.  The
+    first page is therefore timed in-process, and the remaining pages go to a
+    pool only when their estimated serial cost is well above that overhead.
+    Workers are spawned rather than forked because PDFium, already loaded in
+    this process, is not fork-safe.
+    """
+    if page_count == 0:
+        return ""
+    start = time.perf_counter()
+    text = pdfminer_extract_text(str(pdf_path), page_numbers=[0])
+    seconds_per_page = time.perf_counter() - start
+    rest = list(range(1, page_count))
+    workers = min(os.cpu_count() or 1, len(rest))
+    if not rest:
+        return text
+    if workers < 2 or seconds_per_page * len(rest) < 2 * _WORKER_STARTUP_SECONDS:
+        return text + pdfminer_extract_text(str(pdf_path), page_numbers=rest)
+    # Several chunks per worker keeps the pool busy when page costs vary
+    chunks = _chunk_pages(rest, workers * 4)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(str(pdf_path),)) as executor:
+        return text + "".join(executor.map(_extract_chunk_pdfminer, chunks))
+
+
+def _extract_pdf_text(pdf_path: Path) -> str:
+    """Return the embedded text of every page, in page order.
+
+    PDFium does the heavy lifting; it takes well under a millisecond per page,
+    so it always runs in-process.  pdfminer is only consulted when PDFium
+    finds no text at all, since some unusual encodings trip it up.
+    """
+    doc = pdfium.PdfDocument(str(pdf_path))
+    try:
+        page_count = len(doc)
+        text = "\n".join(_page_texts(doc, range(page_count)))
+    finally:
+        doc.close()
+    if not text.strip():
+        text = _pdfminer_text(pdf_path, page_count)
+    return text
+
+
 def parse_pdf(pdf_path: Path) -> List[Dict]:
     """Extract text from a PDF and return a list of entries."""
     print(f"Extracting text from {pdf_path}...")
-    text = extract_text(str(pdf_path))
+    text = _extract_pdf_text(pdf_path)
     print("Text extraction complete.  Parsing entries...")
     entries = list(iter_entries(text))
     print(f"Parsed {len(entries)} entries.")
@@ -105,8 +190,8 @@ def main() -> None:
     entries = parse_pdf(input_path)
     # Write to JSON
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", encoding="utf-8") as f:
-        json.dump(entries, f, ensure_ascii=False, indent=2)
+    with output_path.open("wb") as f:
+        f.write(orjson.dumps(entries, option=orjson.OPT_INDENT_2))
     print(f"Wrote {len(entries)} entries to {output_path}")
 
 
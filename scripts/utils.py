@@ -1,20 +1,77 @@
 """Shared utility functions for the Concordance Project."""
 
+import functools
 import unicodedata
-from typing import Dict
+from typing import TYPE_CHECKING, Dict
+
+if TYPE_CHECKING:
+    import numpy as np
 
 
 def normalize(text: str) -> str:
     """Normalize a string to Unicode NFC and strip whitespace."""
-    return unicodedata.normalize("NFC", text or "").strip()
+    if not text:
+        return ""
+    # Most Hebrew text is already NFC; Quick Check confirms that without
+    # touching the decomposition tables.
+    if unicodedata.is_normalized("NFC", text):
+        return text.strip()
+    return unicodedata.normalize("NFC", text).strip()
+
+
+@functools.lru_cache(maxsize=None)
+def _gematria_tables() -> Dict[str, "np.ndarray"]:
+    """Build codepoint-indexed lookup tables for each gematria method.
+
+    numpy is imported here rather than at module level so that scripts which
+    only need `normalize` (and their worker processes) do not pay for it.
+    """
+    import numpy as np
+
+    # Base letters in alphabetical order and their standard (mispar hechrachi)
+    # values; final forms take the value of their base letter.
+    letters = "אבגדהוזחטיכלמנסעפצקרשת"
+    values = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100, 200, 300, 400]
+    finals = {"ך": "כ", "ם": "מ", "ן": "נ", "ף": "פ", "ץ": "צ"}
+    standard = dict(zip(letters, values))
+    per_method = {
+        "standard": standard,
+        "ordinal": {letter: i for i, letter in enumerate(letters, 1)},
+        # Mispar katan: drop the zeros, so 200 -> 2
+        "reduced": {letter: int(str(v).rstrip("0")) for letter, v in standard.items()},
+        # Each letter is replaced by its mirror (א <-> ת, ב <-> ש, ...)
+        "atbash": {letter: standard[mirror] for letter, mirror in zip(letters, reversed(letters))},
+    }
+    tables: Dict[str, "np.ndarray"] = {}
+    for method, mapping in per_method.items():
+        table = np.zeros(_GEMATRIA_TABLE_SIZE, dtype=np.int32)
+        for letter, value in mapping.items():
+            table[ord(letter)] = value
+        for final, base in finals.items():
+            table[ord(final)] = mapping[base]
+        tables[method] = table
+    return tables
+
+
+# Tables cover everything up to the end of the Hebrew block; any other
+# codepoint (points, punctuation, Latin) contributes nothing.
+_GEMATRIA_TABLE_SIZE = 0x600
 
 
 def gematria(value: str, method: str = "standard") -> int:
     """Compute the gematria value of a Hebrew word.
 
-    Supported methods: 'standard', 'ordinal', 'reduced', 'atbash'.  The
-    implementation here is a stub; you will need to implement the actual
-    numerical mappings according to the chosen method.
+    Supported methods: 'standard', 'ordinal', 'reduced', 'atbash'.  Vowel
+    points, cantillation and any non-Hebrew characters are ignored.  The sum
+    is computed by indexing a per-method lookup table with the word's
+    codepoints, so there is no per-character Python loop.
     """
-    # TODO: Implement gematria calculations
-    raise NotImplementedError("Gematria calculation is not yet implemented")
+    import numpy as np
+
+    table = _gematria_tables().get(method)
+    if table is None:
+        raise ValueError(f"Unsupported gematria method: {method}")
+    codepoints = np.frombuffer(value.encode("utf-32-le"), dtype=np.uint32)
+    # Send out-of-range codepoints to slot 0, which is always zero
+    codepoints = np.where(codepoints < _GEMATRIA_TABLE_SIZE, codepoints, 0)
+    return int(table[codepoints].sum())